@@ -1,12 +1,16 @@
 import math
+from functools import lru_cache
 
 def extended_gcd(a, b):
-    if a == 0:
-        return b, 0, 1
-    gcd, x1, y1 = extended_gcd(b % a, a)
-    x = y1 - (b // a) * x1
-    y = x1
-    return gcd, x, y
+    old_r, r = a, b
+    old_s, s = 1, 0
+    old_t, t = 0, 1
+    while r:
+        q = old_r // r
+        old_r, r = r, old_r - q * r
+        old_s, s = s, old_s - q * s
+        old_t, t = t, old_t - q * t
+    return old_r, old_s, old_t
 
 # Modular Inverse using Extended Euclidean Algorithm
 # a^-1 mod m
@@ -14,45 +18,59 @@ def extended_gcd(a, b):
 # example: mod_inverse(4, 7) = 2 because (4*2) % 7 = 1
 # It returns x such that (a*x) % m = 1
 # It is essential for CRT calculations for Gauss and MRC methods
+# pow(a, -1, m) runs the extended Euclidean algorithm in C (Python 3.8+).
 def mod_inverse(a, m):
-    gcd, x, y = extended_gcd(a, m)
-    if gcd != 1:
-        raise Exception('Modular inverse does not exist')
-    else:
-        return (x % m + m) % m
+    try:
+        return pow(a, -1, m)
+    except ValueError:
+        raise Exception('Modular inverse does not exist') from None
 
+# M = prod(m), M_i = M / m_i and y_i = M_i^-1 mod m_i depend only on the
+# moduli, so they are computed once per moduli tuple and reused by every
+# later call (e.g. one call per coefficient in multi-modulus NTT).
+@lru_cache(maxsize=16)
+def _gauss_terms(m):
+    M = math.prod(m) # Product of all moduli
+    Ms = [M // mi for mi in m] ## M_i for each modulus
+    ys = [mod_inverse(Mi, mi) for Mi, mi in zip(Ms, m)]
+    return M, Ms, ys
 
 # 1. Gauss's Construction Method
-def gauss_crt(m, a):
+# verbose=True prints every step; off by default so library callers only pay for the arithmetic.
+def gauss_crt(m, a, verbose=False):
     total_sum = 0
-    M = math.prod(m) # Product of all moduli
-    print("--- Gauss Method Steps ---")
+    M, Ms, ys = _gauss_terms(tuple(m))
+    if verbose:
+        print("--- Gauss Method Steps ---")
     for i in range(len(m)):
-        print(f"Step {i+1}:")
-        print(f"\tModulus m{i+1} = {m[i]}, Remainder a{i+1} = {a[i]}")
-        Mi = M // m[i] ## M_i for each modulus
-        print(f"\tCalculating M_i = M / m{i+1} = {M} / {m[i]} = {Mi}")
-        yi = mod_inverse(Mi, m[i])
-        print(f"\tCalculating y{i+1} = M_i^(-1) mod m{i+1} = {Mi}^(-1) mod {m[i]} = {yi}, because ({Mi} * {yi}) % {m[i]} = 1")
+        Mi = Ms[i]
+        yi = ys[i]
         wi = a[i] * Mi * yi
-        print(f"\t==> w{i+1} = {a[i]} * {Mi} * {yi} = {wi}")
+        if verbose:
+            print(f"Step {i+1}:")
+            print(f"\tModulus m{i+1} = {m[i]}, Remainder a{i+1} = {a[i]}")
+            print(f"\tCalculating M_i = M / m{i+1} = {M} / {m[i]} = {Mi}")
+            print(f"\tCalculating y{i+1} = M_i^(-1) mod m{i+1} = {Mi}^(-1) mod {m[i]} = {yi}, because ({Mi} * {yi}) % {m[i]} = 1")
+            print(f"\t==> w{i+1} = {a[i]} * {Mi} * {yi} = {wi}")
         total_sum += wi
 
-    print(f"Final Step: x ≡ Σ w_i (mod M) = {total_sum} (mod {M}) = {total_sum % M}")
+    if verbose:
+        print(f"Final Step: x ≡ Σ w_i (mod M) = {total_sum} (mod {M}) = {total_sum % M}")
     # print(f"Thus, x ≡ {total_sum % M} (mod {M})")
     return total_sum % M
 
 
 # 2. Mixed Radix Conversion (MRC Method)
-def mrc_crt(m, a):
+def mrc_crt(m, a, verbose=False):
     n = len(m)
     v = [0] * n
     v[0] = a[0]
-    print("\n--- MRC Method Steps ---")
-    print(f"Step 1:")
-    print(f"\tModulus m1 = {m[0]}, Remainder a1 = {a[0]}")
-    print(f"\t==> v1 = a1 = {v[0]}")
-    print(f"\tPartial solution x1 = v1 = {v[0]}  (mod {m[0]})")
+    if verbose:
+        print("\n--- MRC Method Steps ---")
+        print(f"Step 1:")
+        print(f"\tModulus m1 = {m[0]}, Remainder a1 = {a[0]}")
+        print(f"\t==> v1 = a1 = {v[0]}")
+        print(f"\tPartial solution x1 = v1 = {v[0]}  (mod {m[0]})")
     x_curr = v[0]          # current partial solution x_i
     Mi = m[0]              # product m1*...*m_i used as multiplier in the next step
 
@@ -70,23 +88,25 @@ def mrc_crt(m, a):
         v[i] = (delta * inv) % m[i]
         x_curr = x_prev + v[i] * Mi
 
-        print(f"Step {i+1}:")
-        print(f"\tModulus m{i+1} = {m[i]}, Remainder a{i+1} = {a[i]}")
-        print(f"\tCurrent partial x{i} = {x_prev}")
-        print(f"\tCalculating M{i} = m1*...*m{i} = {Mi}")
-        print(
-            f"\tCalculating inv = M{i}^(-1) mod m{i+1} = {Mi}^(-1) mod {m[i]} = {inv}, "
-            f"because ({Mi} * {inv}) % {m[i]} = 1"
-        )
-        print(f"\tDelta = a{i+1} - x{i} = {a[i]} - {x_prev} = {delta}  (how far current x is from the new remainder)")
-        print(f"\t==> v{i+1} = Delta * inv (mod m{i+1}) = {delta} * {inv} (mod {m[i]}) = {v[i]}")
-        print(f"\tUpdate partial x{i+1} = x{i} + v{i+1}*M{i} = {x_prev} + {v[i]}*{Mi} = {x_curr}")
+        if verbose:
+            print(f"Step {i+1}:")
+            print(f"\tModulus m{i+1} = {m[i]}, Remainder a{i+1} = {a[i]}")
+            print(f"\tCurrent partial x{i} = {x_prev}")
+            print(f"\tCalculating M{i} = m1*...*m{i} = {Mi}")
+            print(
+                f"\tCalculating inv = M{i}^(-1) mod m{i+1} = {Mi}^(-1) mod {m[i]} = {inv}, "
+                f"because ({Mi} * {inv}) % {m[i]} = 1"
+            )
+            print(f"\tDelta = a{i+1} - x{i} = {a[i]} - {x_prev} = {delta}  (how far current x is from the new remainder)")
+            print(f"\t==> v{i+1} = Delta * inv (mod m{i+1}) = {delta} * {inv} (mod {m[i]}) = {v[i]}")
+            print(f"\tUpdate partial x{i+1} = x{i} + v{i+1}*M{i} = {x_prev} + {v[i]}*{Mi} = {x_curr}")
 
         # Update Mi for the next step: Mi = m1*...*m_{i+1}
         Mi *= m[i]
 
-    print("\n--- MRC Final Result ---")
-    print(f"Final x from MRC (mixed-radix) = {x_curr}")
+    if verbose:
+        print("\n--- MRC Final Result ---")
+        print(f"Final x from MRC (mixed-radix) = {x_curr}")
     return x_curr
 
 if __name__ == "__main__":
@@ -102,10 +122,10 @@ if __name__ == "__main__":
     print("\n--- CRT Calculation ---")
     print("*" * 30)
     print("\nCalculating using Gauss Method:")
-    gauss_res = gauss_crt(m, a)
+    gauss_res = gauss_crt(m, a, verbose=True)
     print("*" * 30)
     print("\nCalculating using MRC Method:")
-    mrc_res = mrc_crt(m, a)
+    mrc_res = mrc_crt(m, a, verbose=True)
 
     print("*" * 30)
     print(f"\n[Final Result]")
@@ -0,0 +1,44 @@
+/* ==========================================
+ * Mixed-radix CRT digits (C fallback)
+ * ==========================================
+ * Built on first use by multi_mod_ntt.py with the system C compiler and
+ * loaded through ctypes when numba is not installed. Mirrors _mrc_digits:
+ * 64-bit Montgomery products with an unsigned __int128 accumulator.
+ * ==========================================
+ */
+
+#include <stddef.h>
+#include <stdint.h>
+
+/* x * y * 2^-64 mod p for p < 2^62, with neg_inv = -p^-1 mod 2^64 */
+static inline uint64_t mont_mul62(uint64_t x, uint64_t y, uint64_t mod, uint64_t neg_inv)
+{
+    unsigned __int128 xy = (unsigned __int128)x * y;
+    uint64_t m = (uint64_t)xy * neg_inv;
+    /* xy + m * p is a multiple of 2^64: its low halves carry iff they are non-zero */
+    uint64_t u = (uint64_t)(xy >> 64)
+               + (uint64_t)(((unsigned __int128)m * mod) >> 64)
+               + ((uint64_t)xy != 0);
+    return u >= mod ? u - mod : u;
+}
+
+/*
+ * Turns the (k, n) row-major residue matrix `digits` into mixed-radix digits
+ * in-place: row j becomes (((r_j - v_0) * m_0^-1 - v_1) * m_1^-1 - ...) mod m_j.
+ * inv_mont[j * k + i] = m_i^-1 * 2^64 mod m_j, and offset[j] is a multiple of
+ * m_j above 2^62 that keeps every difference non-negative.
+ */
+void crt_digits(int64_t *digits, size_t k, size_t n, const int64_t *moduli,
+                const int64_t *inv_mont, const uint64_t *neg_inv, const int64_t *offset)
+{
+    for (size_t j = 1; j < k; j++) {
+        uint64_t mod = (uint64_t)moduli[j];
+        uint64_t *t = (uint64_t *)(digits + j * n);
+        for (size_t i = 0; i < j; i++) {
+            const int64_t *v = digits + i * n;
+            uint64_t w = (uint64_t)inv_mont[j * k + i];
+            for (size_t c = 0; c < n; c++)
+                t[c] = mont_mul62(t[c] - (uint64_t)v[c] + (uint64_t)offset[j], w, mod, neg_inv[j]);
+        }
+    }
+}
@@ -7,8 +7,117 @@
 # by combining results from multiple NTT-friendly primes.
 # ==========================================
 
-from NTT import NTTContext
-from CRT import mrc_crt
+import ctypes
+import hashlib
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from ntt_core import (NTTContext, NTTContext64, make_context, _DISK_CACHE_DIR, _HAS_NUMBA,
+                      _mont_mul62, _shoup_mul62)
+
+if _HAS_NUMBA:
+    from numba import njit, prange
+
+# Below this many coefficients the per-stage NumPy overhead of _mrc_batch
+# outweighs the scalar loop of _mrc_fast.
+_MRC_BATCH_MIN = 8
+
+# Output lengths from which the per-modulus multiplications run on a thread
+# pool. They share no state and the NTT kernels release the GIL, so the
+# towers overlap; below this the thread hand-off costs more than it saves.
+_PARALLEL_MIN_LEN = 1 << 12
+
+# Column count from which _mrc_batch launches the prange kernel. Numba's
+# default TBB threading layer hangs at interpreter exit once a parallel
+# kernel has run off the main thread, so pool workers and other threads
+# always take the serial twin.
+_MRC_PARALLEL_MIN = 1 << 15
+
+# Worker pool, created on first parallel multiply
+_executor = None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    return _executor
+
+# Without numba the MRC digits come from crt_reconstruct.c, compiled with
+# the system C compiler on first use and cached next to the NTT tables
+# (one build per source version). If no compiler is available, or the
+# build fails, _mrc_batch falls back to NumPy.
+_CRT_SOURCE = Path(__file__).with_name("crt_reconstruct.c")
+_crt_lib = None  # False once building or loading has failed
+
+def _get_crt_lib():
+    """Returns the ctypes handle of crt_reconstruct.c, or None if it cannot be built."""
+    global _crt_lib
+    if _crt_lib is None:
+        _crt_lib = _load_crt_lib() or False
+    return _crt_lib or None
+
+def _load_crt_lib():
+    try:
+        source = _CRT_SOURCE.read_bytes()
+        lib_path = _DISK_CACHE_DIR / f"crt_reconstruct-{hashlib.sha1(source).hexdigest()[:12]}.so"
+        if not lib_path.exists():
+            lib_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = lib_path.with_suffix(f".{os.getpid()}.tmp")
+            subprocess.run([os.environ.get("CC", "cc"), "-O3", "-shared", "-fPIC",
+                            str(_CRT_SOURCE), "-o", str(tmp)], check=True, capture_output=True)
+            os.replace(tmp, lib_path)
+        lib = ctypes.CDLL(str(lib_path))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    
+    i64 = np.ctypeslib.ndpointer(np.int64, flags="C")
+    u64 = np.ctypeslib.ndpointer(np.uint64, flags="C")
+    lib.crt_digits.argtypes = [i64, ctypes.c_size_t, ctypes.c_size_t, i64, i64, u64, i64]
+    lib.crt_digits.restype = None
+    return lib
+
+if _HAS_NUMBA:
+    @njit(cache=True, parallel=True, nogil=True, boundscheck=False)
+    def _mrc_digits(residues, moduli, inv_mont, neg_inv, offset, digits):
+        """
+        Mixed-radix digits of every column of `residues` (k, N) into `digits`,
+        one coefficient per parallel iteration. Products use Montgomery with
+        R = 2^64: inv_mont[j, i] = m_i^-1 * R mod m_j, neg_inv[j] = -m_j^-1 mod R,
+        and offset[j] (see MultiModNTT.__init__) keeps differences non-negative,
+        so any moduli below 2^62 work without a division. A Shoup multiply
+        needs one high product less but measured ~10-25% slower here.
+        """
+        k, n = residues.shape
+        for c in prange(n):
+            for j in range(k):
+                mj = moduli[j]
+                t = residues[j, c]
+                for i in range(j):
+                    t = _mont_mul62(t - digits[i, c] + offset[j], inv_mont[j, i], mj, neg_inv[j])
+                digits[j, c] = t
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _mrc_digits_serial(residues, moduli, inv_mont, neg_inv, offset, digits):
+        """Single-threaded _mrc_digits, safe to call from any thread."""
+        k, n = residues.shape
+        for c in range(n):
+            for j in range(k):
+                mj = moduli[j]
+                t = residues[j, c]
+                for i in range(j):
+                    t = _mont_mul62(t - digits[i, c] + offset[j], inv_mont[j, i], mj, neg_inv[j])
+                digits[j, c] = t
+
+@lru_cache(maxsize=None)
+def _get_context(mod):
+    """Returns the shared NTTContext for `mod`, so its tables are built once per process."""
+    return make_context(mod)
 
 class MultiModNTT:
     """
@@ -16,43 +125,241 @@ class MultiModNTT:
     and reconstructs the results using the Chinese Remainder Theorem.
     """
     
-    def __init__(self, primes):
+    def __init__(self, primes, n=None):
         """
         Args:
             primes (list): List of prime moduli.
+            n (int, optional): Transform size to compile every context for up
+                front (see NTTContext.compile), for callers with a fixed size.
         """
-        self.contexts = [NTTContext(m) for m in primes]
+        self.contexts = [_get_context(m) for m in primes]
+        if n is not None:
+            for ctx in self.contexts:
+                ctx.compile(n)
         self.moduli = primes
+        
+        # Mixed-radix (Garner) inverses, computed once per modulus set:
+        # _crt_inv[j][i] = m_i^-1 mod m_j for i < j
+        # Residues of 31-bit moduli are stored as uint32, wider ones as int64,
+        # and those of moduli beyond 62 bits (NTTContextBig) as Python ints
+        if max(primes) < (1 << 32):
+            self._residue_dtype = np.uint32
+        elif max(primes) < (1 << NTTContext64._mod_bits):
+            self._residue_dtype = np.int64
+        else:
+            self._residue_dtype = object
+        self._crt_inv = [[pow(primes[i], -1, primes[j]) for i in range(j)]
+                         for j in range(len(primes))]
+        
+        # The same inverses as arrays for _mrc_batch: in Montgomery form for
+        # the compiled kernel, with 64-bit Shoup companions floor(inv * 2^64 / m_j)
+        # for the NumPy path. offset[j] is a multiple of m_j above 2^62 that
+        # keeps differences of residues non-negative.
+        if self._residue_dtype is not object:
+            self._init_crt_arrays(primes)
+
+    def _init_crt_arrays(self, primes):
+        """
+        Builds the int64/uint64 tables of _mrc_batch. They need every modulus
+        below 2^62, so sets with a wider one reconstruct through _mrc_fast.
+        """
+        k, r = len(primes), 1 << 64
+        self._crt_moduli = np.array(primes, dtype=np.int64)
+        self._crt_inv_mont = np.zeros((k, k), dtype=np.int64)
+        self._crt_inv_shoup = np.zeros((k, k), dtype=np.uint64)
+        for j in range(k):
+            for i in range(j):
+                self._crt_inv_mont[j, i] = self._crt_inv[j][i] * r % primes[j]
+                self._crt_inv_shoup[j, i] = (self._crt_inv[j][i] << 64) // primes[j]
+        self._crt_neg_inv = np.array([(-pow(m, -1, r)) % r for m in primes], dtype=np.uint64)
+        self._crt_offset = np.array([m * ((1 << 62) // m + 1) for m in primes], dtype=np.int64)
+        
+        # Leading digits whose radix product stays below 2^63 are combined
+        # in int64; only the rest of the Horner evaluation needs Python ints.
+        self._horner_split, prod = 1, primes[0]
+        while self._horner_split < k and prod * primes[self._horner_split] < (1 << 63):
+            prod *= primes[self._horner_split]
+            self._horner_split += 1
+        self._horner_radix = prod
 
     def multiply(self, a, b):
         """
         Multiplies polynomials a and b using multiple NTT moduli.
         """
-        # 1. Perform NTT multiplication for each modulus
-        results_per_mod = []
-        for ctx in self.contexts:
-            res = ctx.multiply(a, b)
-            results_per_mod.append(res)
+        # 1. Perform NTT multiplication for each modulus, each context writing
+        # its residues into one row of a (k, N) matrix, so that column i holds
+        # the remainders of coefficient i
+        num_coeffs = len(a) + len(b) - 1
+        results = np.empty((len(self.contexts), num_coeffs), dtype=self._residue_dtype)
+        if self._use_pool(num_coeffs):
+            list(_get_executor().map(lambda i: self.contexts[i].multiply_into(a, b, results[i]),
+                                     range(len(self.contexts))))
+        else:
+            for ctx, row in zip(self.contexts, results):
+                ctx.multiply_into(a, b, row)
             
-        # 2. Reconstruct each coefficient using CRT
-        # results_per_mod is a list of results: [res_m1, res_m2, res_m3]
-        # We need to take res_m1[i], res_m2[i], res_m3[i] and apply CRT.
+        # 2. Reconstruct all coefficients at once using CRT
+        return self._reconstruct(results)
+
+    def multiply_batch(self, polys_a, polys_b):
+        """
+        Multiplies polys_a[i] * polys_b[i] for every i. Each modulus runs the
+        whole batch through NTTContext's batched transforms, and a single CRT
+        pass reconstructs the coefficients of all products together.
+        
+        Args:
+            polys_a (list): Left operands (lists or ndarrays of coefficients).
+            polys_b (list): Right operands, same length as polys_a.
+        
+        Returns:
+            list: The products as lists of integers.
+        """
+        if len(polys_a) != len(polys_b):
+            raise ValueError("polys_a and polys_b must have the same length")
+        if not polys_a:
+            return []
+        target_lens = [len(a) + len(b) - 1 for a, b in zip(polys_a, polys_b)]
         
-        final_result = []
-        num_coeffs = len(results_per_mod[0])
+        # 1. One (batch, n) product matrix per modulus, stacked to (k, batch, n)
+        if self._use_pool(sum(target_lens)):
+            mats = list(_get_executor().map(lambda ctx: ctx._product_batch(polys_a, polys_b),
+                                            self.contexts))
+        else:
+            mats = [ctx._product_batch(polys_a, polys_b) for ctx in self.contexts]
+        results = np.stack(mats)
         
-        for i in range(num_coeffs):
-            remainders = [res[i] for res in results_per_mod]
-            # Use mrc_crt for reconstruction
-            # Note: mrc_crt in CRT.py has lots of prints, 
-            # for library use we might want a silent version.
-            # For this demo, let's just use it.
-            val = mrc_crt(self.moduli, remainders)
-            final_result.append(val)
-            
-        return final_result
+        # 2. Reconstruct only the columns inside each product, all at once
+        k, count, n = results.shape
+        results = results.reshape(k, count * n)
+        if sum(target_lens) < count * n:
+            cols = np.concatenate([np.arange(i * n, i * n + target_len)
+                                   for i, target_len in enumerate(target_lens)])
+            results = results[:, cols]
+        coeffs = self._reconstruct(results)
+        
+        products, start = [], 0
+        for target_len in target_lens:
+            products.append(coeffs[start:start + target_len])
+            start += target_len
+        return products
+
+    def _use_pool(self, num_coeffs):
+        """Whether the per-modulus work for `num_coeffs` output coefficients runs on the thread pool."""
+        return (len(self.contexts) > 1 and (os.cpu_count() or 1) > 1
+                and num_coeffs >= _PARALLEL_MIN_LEN)
+
+    def _reconstruct(self, residues):
+        """
+        CRT of every column of a (k, num_coeffs) residue matrix: scalar MRC
+        for a few coefficients or moduli beyond 62 bits, the batched one otherwise.
+        
+        Returns:
+            list: The reconstructed coefficients as Python ints.
+        """
+        if residues.shape[1] < _MRC_BATCH_MIN or self._residue_dtype is object:
+            return [self._mrc_fast(remainders) for remainders in zip(*residues.tolist())]
+        return self._mrc_batch(residues).tolist()
+
+    def _mrc_fast(self, remainders):
+        """
+        Mixed-radix CRT of a single coefficient from its remainders, using the
+        inverses precomputed in __init__ (no per-call inversions or prints).
+        """
+        digits = []
+        for j, mj in enumerate(self.moduli):
+            t = remainders[j]
+            for i in range(j):
+                t = (t - digits[i]) * self._crt_inv[j][i] % mj
+            digits.append(t)
+        
+        x = digits[-1]
+        for j in range(len(self.moduli) - 2, -1, -1):
+            x = x * self.moduli[j] + digits[j]
+        return x
+
+    def _mrc_batch(self, residues):
+        """
+        Mixed-radix CRT of every column of a (k, num_coeffs) uint32 or int64
+        residue matrix.
+        With numba the digits come from _mrc_digits (parallel for large
+        inputs on the main thread, see _MRC_PARALLEL_MIN),
+        otherwise from crt_reconstruct.c if it builds; failing both, each
+        stage is one array-wide subtract/multiply in NumPy.
+        
+        Returns:
+            np.ndarray: The reconstructed coefficients in [0, M) (int64 if M < 2^63, else object).
+        """
+        if _HAS_NUMBA:
+            digits = np.empty(residues.shape, dtype=np.int64)
+            if (residues.shape[1] >= _MRC_PARALLEL_MIN
+                    and threading.current_thread() is threading.main_thread()):
+                kernel = _mrc_digits
+            else:
+                kernel = _mrc_digits_serial
+            kernel(residues, self._crt_moduli, self._crt_inv_mont,
+                   self._crt_neg_inv, self._crt_offset, digits)
+        elif _get_crt_lib() is not None:
+            digits = residues.astype(np.int64, order="C")
+            _get_crt_lib().crt_digits(digits, digits.shape[0], digits.shape[1], self._crt_moduli,
+                                      self._crt_inv_mont, self._crt_neg_inv, self._crt_offset)
+        else:
+            # Mixed-radix digits: v_j = (((r_j - v_0) * m_0^-1 - v_1) * m_1^-1 - ...) mod m_j.
+            # For two primes this is the closed form
+            # x = r_0 + ((r_1 - r_0) * m_0^-1 mod m_1) * m_0.
+            # 62-bit products overflow int64, so those stages take one Shoup
+            # multiply on the offset difference (below 2^63) instead of the
+            # context's two Montgomery products. Smaller moduli keep NumPy's
+            # int64 %, which outruns a Shoup multiply built from array ops.
+            digits = residues.astype(np.int64)
+            for j in range(1, len(self.moduli)):
+                mj, offset = self.moduli[j], self._crt_offset[j]
+                t = digits[j]
+                for i in range(j):
+                    if mj < (1 << NTTContext._mod_bits):
+                        t = (t - digits[i]) % mj * self._crt_inv[j][i] % mj
+                    else:
+                        t = _shoup_mul62(t - digits[i] + offset, self._crt_inv[j][i],
+                                         self._crt_inv_shoup[j, i], mj)
+                digits[j] = t
+        
+        # Horner: x = v_0 + m_0 * (v_1 + m_1 * (v_2 + ...)), in int64 for the
+        # leading digits and in Python ints for the rest
+        split = self._horner_split
+        low = digits[split - 1].copy()
+        for j in range(split - 2, -1, -1):
+            low = low * self.moduli[j] + digits[j]
+        if split == len(self.moduli):
+            return low
+        high = digits[-1].astype(object)
+        for j in range(len(self.moduli) - 2, split - 1, -1):
+            high = high * self.moduli[j] + digits[j].astype(object)
+        return low.astype(object) + high * self._horner_radix
+
+def _fuzz(mm_ntt, rounds, max_len=64, seed=0):
+    """
+    Checks mm_ntt.multiply against an exact convolution on random inputs
+    whose product coefficients stay below the modulus product M.
+    """
+    rng = np.random.default_rng(seed)
+    m_prod = 1
+    for m in mm_ntt.moduli:
+        m_prod *= m
+    bits = (m_prod.bit_length() - 1 - max_len.bit_length()) // 2
+    for _ in range(rounds):
+        a, b = ([int(x) for x in rng.integers(0, 1 << min(bits, 62), rng.integers(1, max_len + 1))]
+                for _ in range(2))
+        expected = np.convolve(np.array(a, dtype=object), np.array(b, dtype=object))
+        if not np.array_equal(np.array(mm_ntt.multiply(a, b), dtype=object), expected):
+            return False
+    return True
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Multi-Modulus NTT Demo")
+    parser.add_argument("--fuzz", type=int, default=0, metavar="ROUNDS",
+                        help="Also check ROUNDS random products against an exact convolution")
+    args = parser.parse_args()
+    
     # Selected 3 Primes from prime_search.py
     # Roots (g) are now calculated dynamically within NTTContext
     primes = [
@@ -89,15 +396,31 @@ if __name__ == "__main__":
     multi_res = mm_ntt.multiply(p1, p2)
     print(f"  Result: {multi_res}")
     
+    # 3. Two 62-bit primes cover the same range with one NTT fewer
+    wide_primes = [
+        4179340454199820289, # 29 * 2^57 + 1
+        2485986994308513793  # 69 * 2^55 + 1
+    ]
+    print(f"\n[Multi-Modulus res (2 x 62-bit Primes)]")
+    wide_ntt = MultiModNTT(wide_primes)
+    wide_res = wide_ntt.multiply(p1, p2)
+    print(f"  Result: {wide_res}")
+    
     # Verification
     expected = [large_val * large_val, 2 * large_val * large_val, large_val * large_val]
     print(f"\nExpected result (Large Numbers):")
     print(f"  {expected}")
     
-    if multi_res == expected:
+    expected_arr = np.array(expected, dtype=object)
+    if (np.array_equal(np.array(multi_res, dtype=object), expected_arr)
+            and np.array_equal(np.array(wide_res, dtype=object), expected_arr)):
         print("\nMulti-Modulus Verification SUCCESS! ✅")
         print("We successfully reconstructed coefficients > 2^60!")
     else:
         print("\nMulti-Modulus Verification FAILED! ❌")
+    
+    if args.fuzz:
+        ok = _fuzz(mm_ntt, args.fuzz) and _fuzz(wide_ntt, args.fuzz)
+        print(f"\nCRT fuzz ({args.fuzz} rounds per prime set): {'SUCCESS ✅' if ok else 'FAILED ❌'}")
         
     print("-" * 60)
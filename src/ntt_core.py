@@ -0,0 +1,1040 @@
+# ==========================================
+# NTT Core: Canonical Transform Engine
+# ==========================================
+# Kernels, twiddle tables and NTTContext live here; NTT.py and the
+# other front ends import from this module instead of carrying copies.
+# ==========================================
+
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from prime_search import get_primitive_root, get_2_adic_valuation, get_root_of_unity
+except ImportError:
+    # Fallback if prime_search is not in path or has issues
+    from sympy.ntheory import primitive_root
+    @lru_cache(maxsize=None)
+    def get_primitive_root(p): return int(primitive_root(p))
+    @lru_cache(maxsize=None)
+    def get_2_adic_valuation(p):
+        p1 = p - 1
+        return (p1 & -p1).bit_length() - 1
+
+# Kernels called directly from Python are compiled with nogil=True, so
+# transforms on separate contexts can overlap on a thread pool.
+try:
+    from numba import njit, types
+    from numba.extending import intrinsic, overload
+    from llvmlite import ir
+    _HAS_NUMBA = True
+except ImportError:
+    # numba is optional: kernels below then run as plain Python/NumPy
+    _HAS_NUMBA = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+# ==========================================
+# Montgomery arithmetic
+# ==========================================
+# R = 2^31 rather than 2^32: for a 31-bit p, t + m * p < 2^63, so the
+# reduction never leaves signed int64 (NumPy and numba alike).
+_MONT_BITS = 31
+_MONT_MASK = (1 << _MONT_BITS) - 1
+
+@njit(cache=True, nogil=True)
+def _mont_reduce(t, mod, mod_neg_inv):
+    """
+    Returns t * R^-1 mod p for 0 <= t < p * R, using a mask, two multiplies
+    and a shift instead of a division. Works on scalars and int64 arrays.
+    """
+    m = ((t & _MONT_MASK) * mod_neg_inv) & _MONT_MASK
+    u = (t + m * mod) >> _MONT_BITS
+    return u - mod * (u >= mod)
+
+@njit(cache=True, nogil=True)
+def _mont_mul(x, y, mod, mod_neg_inv):
+    """Montgomery product x * y * R^-1 mod p."""
+    return _mont_reduce(x * y, mod, mod_neg_inv)
+
+# ==========================================
+# Shoup (preconditioned) multiplication
+# ==========================================
+# For a constant w, w' = floor(w * 2^31 / p) turns x * w mod p into two
+# multiplies, a shift and one conditional subtract. Inputs x < 2^31 keep
+# every product below 2^62.
+# NTT primes p = k * 2^m + 1 also admit a K-RED style reduction (k * lo - hi,
+# applied twice, with twiddles pre-scaled by k^-2). Even with k and m baked
+# in as constants it measured ~10% slower than this per product under numba,
+# so every modulus shares the Shoup path.
+_SHOUP_BITS = 31
+
+def _compact(table):
+    """Stores a reduced table (all values < 2^31) as int32, halving its footprint."""
+    return table.astype(np.int32)
+
+def _shoup_precompute(w, mod):
+    """Returns floor(w * 2^31 / p) for a scalar or int64 array w."""
+    return (w << _SHOUP_BITS) // mod
+
+@njit(cache=True)
+def _shoup_mul31(x, w, w_shoup, mod):
+    """Returns x * w mod p given w_shoup = _shoup_precompute(w, p)."""
+    q = (x * w_shoup) >> _SHOUP_BITS
+    r = x * w - q * mod
+    return r - mod * (r >= mod)
+
+# ==========================================
+# 62-bit arithmetic (NTTContext64)
+# ==========================================
+# For p < 2^62 a product of two residues needs 128 bits. Its high half
+# comes from a single widening multiply under numba (an LLVM i128 mul) or
+# from four 32-bit partial products in NumPy; with it, Shoup and Montgomery
+# multiplication work as above with 2^64 in place of 2^31. Sums of two
+# residues stay below 2^63, so the add/sub butterflies are shared.
+_LO32 = np.uint64(0xFFFFFFFF)
+_HI_SHIFT = np.uint64(32)
+
+def _mulhi_numpy(a, b):
+    """High 64 bits of a * b for uint64 scalars or arrays."""
+    a0, a1 = a & _LO32, a >> _HI_SHIFT
+    b0, b1 = b & _LO32, b >> _HI_SHIFT
+    lo_hi, hi_lo = a0 * b1, a1 * b0
+    mid = ((a0 * b0) >> _HI_SHIFT) + (lo_hi & _LO32) + (hi_lo & _LO32)
+    return a1 * b1 + (lo_hi >> _HI_SHIFT) + (hi_lo >> _HI_SHIFT) + (mid >> _HI_SHIFT)
+
+if _HAS_NUMBA:
+    @intrinsic
+    def _mulhi(typingctx, a, b):
+        """High 64 bits of the 128-bit product of two uint64 scalars."""
+        sig = types.uint64(types.uint64, types.uint64)
+        def codegen(context, builder, signature, args):
+            wide = ir.IntType(128)
+            prod = builder.mul(builder.zext(args[0], wide), builder.zext(args[1], wide))
+            return builder.trunc(builder.lshr(prod, ir.Constant(wide, 64)), ir.IntType(64))
+        return sig, codegen
+else:
+    _mulhi = _mulhi_numpy
+
+def _shoup_precompute62(w, mod):
+    """Returns floor(w * 2^64 / p) as uint64 for a scalar or int64 array w."""
+    if isinstance(w, np.ndarray):
+        return ((w.astype(object) << 64) // mod).astype(np.uint64)
+    return np.uint64((int(w) << 64) // mod)
+
+@njit(cache=True)
+def _shoup_mul62(x, w, w_shoup, mod):
+    """62-bit twin of _shoup_mul31, with w_shoup = _shoup_precompute62(w, p)."""
+    xu = np.uint64(x)
+    q = _mulhi(xu, np.uint64(w_shoup))
+    r = np.int64(xu * np.uint64(w) - q * np.uint64(mod))
+    return r - mod * (r >= mod)
+
+@njit(cache=True)
+def _mont_mul62(x, y, mod, mod_neg_inv):
+    """Montgomery product x * y * 2^-64 mod p for p < 2^62, with mod_neg_inv = -p^-1 mod 2^64."""
+    xu = np.uint64(x)
+    yu = np.uint64(y)
+    lo = xu * yu
+    m = lo * np.uint64(mod_neg_inv)
+    # x * y + m * p is a multiple of 2^64: its low halves carry iff lo != 0
+    u = np.int64(_mulhi(xu, yu) + _mulhi(m, np.uint64(mod)) + np.uint64(lo != 0))
+    return u - mod * (u >= mod)
+
+@njit(cache=True, boundscheck=False, nogil=True)
+def _mont_mul62_arrays(x, y, mod, mod_neg_inv, out):
+    """Element-wise _mont_mul62 over flat int64 arrays (the intrinsic is scalar-only)."""
+    for i in range(out.shape[0]):
+        out[i] = _mont_mul62(x[i], y[i], mod, mod_neg_inv)
+
+def _shoup_mul(x, w, w_shoup, mod):
+    """
+    Returns x * w mod p given the Shoup companion w_shoup of w. uint64
+    companions belong to 62-bit moduli and select _shoup_mul62.
+    """
+    if np.asarray(w_shoup).dtype == np.uint64:
+        return _shoup_mul62(x, w, w_shoup, mod)
+    return _shoup_mul31(x, w, w_shoup, mod)
+
+if _HAS_NUMBA:
+    @overload(_shoup_mul)
+    def _shoup_mul_jit(x, w, w_shoup, mod):
+        # Resolved per compiled signature, so the 31-bit kernels carry no branch
+        if w_shoup == types.uint64:
+            return lambda x, w, w_shoup, mod: _shoup_mul62(x, w, w_shoup, mod)
+        return lambda x, w, w_shoup, mod: _shoup_mul31(x, w, w_shoup, mod)
+
+# ==========================================
+# Butterfly kernels
+# ==========================================
+
+@njit(cache=True, boundscheck=False)
+def _bit_reverse(a, swaps):
+    """
+    Applies the bit-reversal permutation to `a` in-place. `swaps` is a
+    (k, 2) table of the index pairs i < rev[i], so only real swaps are visited.
+    """
+    for k in range(swaps.shape[0]):
+        i = swaps[k, 0]
+        j = swaps[k, 1]
+        a[i], a[j] = a[j], a[i]
+
+@njit(cache=True)
+def _add_mod(x, y, mod):
+    """(x + y) mod p for reduced x, y (scalars or arrays)."""
+    s = x + y
+    return s - mod * (s >= mod)
+
+@njit(cache=True)
+def _sub_mod(x, y, mod):
+    """(x - y) mod p for reduced x, y (scalars or arrays)."""
+    d = x - y
+    return d + mod * (d < 0)
+
+@njit(cache=True, boundscheck=False)
+def _first_radix2_stage(a, mod):
+    """The length-2 stage: its only twiddle is w^0 = 1, so no multiplies."""
+    for i in range(0, a.shape[0], 2):
+        u = a[i]
+        v = a[i + 1]
+        a[i] = _add_mod(u, v, mod)
+        a[i + 1] = _sub_mod(u, v, mod)
+
+@njit(cache=True, boundscheck=False)
+def _first_radix4_stage(a, imag, imag_shoup, mod):
+    """
+    The length-4 radix-4 pass (h = 1): j is always 0, so w, w^2 and w^3 are
+    all 1 and only the multiply by the 4th root `imag` remains.
+    """
+    for i in range(0, a.shape[0], 4):
+        x0, y1, y2, y3 = a[i], a[i + 1], a[i + 2], a[i + 3]
+        s0 = _add_mod(x0, y1, mod)
+        d0 = _sub_mod(x0, y1, mod)
+        s1 = _add_mod(y2, y3, mod)
+        d1 = _shoup_mul(_sub_mod(y2, y3, mod), imag, imag_shoup, mod)
+        a[i] = _add_mod(s0, s1, mod)
+        a[i + 1] = _add_mod(d0, d1, mod)
+        a[i + 2] = _sub_mod(s0, s1, mod)
+        a[i + 3] = _sub_mod(d0, d1, mod)
+
+@njit(cache=True, boundscheck=False)
+def _radix4_stage(a, roots, roots_shoup, roots3, roots3_shoup, mod, h):
+    """
+    Two fused radix-2 stages (lengths 2h and 4h) as one radix-4 pass.
+    With w = w_4h^j the inputs are twisted by w^2, w and w^3, and the
+    odd outputs pick up the 4th root of unity `imag` = w_4h^h.
+    """
+    n = a.shape[0]
+    h2, h3 = 2 * h, 3 * h
+    imag, imag_shoup = roots[3], roots_shoup[3]
+    # Blocks stay the outer loop: walking one twiddle across all blocks
+    # (j outer) turns every stage into h strided sweeps over the array.
+    for i in range(0, n, 4 * h):
+        for j in range(h):
+            x0 = a[i + j]
+            y1 = _shoup_mul(a[i + j + h], roots[h + j], roots_shoup[h + j], mod)
+            y2 = _shoup_mul(a[i + j + h2], roots[h2 + j], roots_shoup[h2 + j], mod)
+            y3 = _shoup_mul(a[i + j + h3], roots3[h + j], roots3_shoup[h + j], mod)
+            s0 = _add_mod(x0, y1, mod)
+            d0 = _sub_mod(x0, y1, mod)
+            s1 = _add_mod(y2, y3, mod)
+            d1 = _shoup_mul(_sub_mod(y2, y3, mod), imag, imag_shoup, mod)
+            a[i + j] = _add_mod(s0, s1, mod)
+            a[i + j + h] = _add_mod(d0, d1, mod)
+            a[i + j + h2] = _sub_mod(s0, s1, mod)
+            a[i + j + h3] = _sub_mod(d0, d1, mod)
+
+@njit(cache=True, boundscheck=False)
+def _ntt_kernel(a, roots, roots_shoup, roots3, roots3_shoup, mod, max_length):
+    """
+    Cooley-Tukey stages of length 2..max_length over a bit-reversed int64
+    array, two stages at a time (radix-4) with one leading radix-2 stage
+    when the stage count is odd. `roots`/`roots3` are the per-stage tables
+    built by NTTContext._prepare and `*_shoup` their Shoup companions.
+    The first stage only has trivial twiddles and runs multiply-free.
+    """
+    stages = 0
+    while (1 << stages) < max_length:
+        stages += 1
+    if stages == 0:
+        return
+    if stages % 2 == 1:
+        _first_radix2_stage(a, mod)
+        h = 2
+    else:
+        _first_radix4_stage(a, roots[3], roots_shoup[3], mod)
+        h = 4
+    while 4 * h <= max_length:
+        _radix4_stage(a, roots, roots_shoup, roots3, roots3_shoup, mod, h)
+        h *= 4
+
+def _ntt_kernel_numpy(a, roots, roots_shoup, roots3, roots3_shoup, mod, max_length):
+    """
+    Vectorized equivalent of `_ntt_kernel`, used when numba is unavailable.
+    `a` may also be a (rows, n) matrix; every row is transformed.
+    """
+    n = a.shape[-1]
+    stages = max_length.bit_length() - 1
+    h = 1
+    if stages % 2 == 1:
+        # View the array as blocks of the stage length, so a whole stage is
+        # a few vectorized passes. The length-2 twiddle is 1: no multiply.
+        blocks = a.reshape(-1, 2)
+        u = blocks[:, :1]
+        v = blocks[:, 1:]
+        lo, hi = _add_mod(u, v, mod), _sub_mod(u, v, mod)
+        blocks[:, :1] = lo
+        blocks[:, 1:] = hi
+        h = 2
+    imag, imag_shoup = (roots[3], roots_shoup[3]) if n >= 4 else (0, 0)
+    while 4 * h <= max_length:
+        # Broadcast each twiddle row against all blocks; for h = 1 they are all 1
+        blocks = a.reshape(-1, 4 * h)
+        x0 = blocks[:, :h]
+        if h == 1:
+            y1, y2, y3 = blocks[:, 1:2], blocks[:, 2:3], blocks[:, 3:]
+        else:
+            y1 = _shoup_mul(blocks[:, h:2 * h], roots[h:2 * h], roots_shoup[h:2 * h], mod)
+            y2 = _shoup_mul(blocks[:, 2 * h:3 * h], roots[2 * h:3 * h], roots_shoup[2 * h:3 * h], mod)
+            y3 = _shoup_mul(blocks[:, 3 * h:], roots3[h:2 * h], roots3_shoup[h:2 * h], mod)
+        s0, d0 = _add_mod(x0, y1, mod), _sub_mod(x0, y1, mod)
+        s1 = _add_mod(y2, y3, mod)
+        d1 = _shoup_mul(_sub_mod(y2, y3, mod), imag, imag_shoup, mod)
+        blocks[:, :h] = _add_mod(s0, s1, mod)
+        blocks[:, h:2 * h] = _add_mod(d0, d1, mod)
+        blocks[:, 2 * h:3 * h] = _sub_mod(s0, s1, mod)
+        blocks[:, 3 * h:] = _sub_mod(d0, d1, mod)
+        h *= 4
+
+@njit(cache=True, boundscheck=False)
+def _last_stage_scaled(a, roots, roots_shoup, scale, scale_shoup, mod):
+    """
+    Final (length n) stage of an inverse transform with the 1/n factor folded
+    in: `roots` are the stage twiddles pre-multiplied by `scale`, so only the
+    upper input of each butterfly needs an extra multiply, and the outputs
+    come out fully reduced without a separate scaling pass.
+    """
+    half = a.shape[0] >> 1
+    for j in range(half):
+        u = _shoup_mul(a[j], scale, scale_shoup, mod)
+        v = _shoup_mul(a[j + half], roots[j], roots_shoup[j], mod)
+        a[j] = _add_mod(u, v, mod)
+        a[j + half] = _sub_mod(u, v, mod)
+
+def _last_stage_scaled_numpy(a, roots, roots_shoup, scale, scale_shoup, mod):
+    """Vectorized equivalent of `_last_stage_scaled` (rows of `a` independently)."""
+    half = a.shape[-1] // 2
+    u = _shoup_mul(a[..., :half], scale, scale_shoup, mod)
+    v = _shoup_mul(a[..., half:], roots, roots_shoup, mod)
+    lo, hi = _add_mod(u, v, mod), _sub_mod(u, v, mod)
+    a[..., :half] = lo
+    a[..., half:] = hi
+
+@njit(cache=True, boundscheck=False, nogil=True)
+def _ntt_rows(mat, swaps, roots, roots_shoup, roots3, roots3_shoup,
+              last_roots, last_roots_shoup, scale, scale_shoup, mod, invert):
+    """
+    Transforms every row of a C-contiguous (rows, m) int64 matrix in-place.
+    For an inverse transform the last stage uses `last_roots` and folds in
+    the 1/m factor `scale`.
+    """
+    m = mat.shape[1]
+    for r in range(mat.shape[0]):
+        row = mat[r]
+        _bit_reverse(row, swaps)
+        if not invert:
+            _ntt_kernel(row, roots, roots_shoup, roots3, roots3_shoup, mod, m)
+        elif m > 1:
+            _ntt_kernel(row, roots, roots_shoup, roots3, roots3_shoup, mod, m // 2)
+            _last_stage_scaled(row, last_roots, last_roots_shoup, scale, scale_shoup, mod)
+
+def _ntt_rows_numpy(mat, rev, roots, roots_shoup, roots3, roots3_shoup,
+                    last_roots, last_roots_shoup, scale, scale_shoup, mod, invert):
+    """Vectorized equivalent of `_ntt_rows`; all rows go through each stage together."""
+    m = mat.shape[1]
+    mat[:] = mat[:, rev]
+    if not invert:
+        _ntt_kernel_numpy(mat, roots, roots_shoup, roots3, roots3_shoup, mod, m)
+    elif m > 1:
+        _ntt_kernel_numpy(mat, roots, roots_shoup, roots3, roots3_shoup, mod, m // 2)
+        _last_stage_scaled_numpy(mat, last_roots, last_roots_shoup, scale, scale_shoup, mod)
+
+# Edge of the square tiles used when transposing, small enough that a
+# source and destination tile both stay in L1.
+_TILE = 32
+
+@njit(cache=True, boundscheck=False, nogil=True)
+def _transpose(src, dst):
+    """dst = src.T, walking both matrices in cache-sized tiles."""
+    rows, cols = src.shape
+    for i0 in range(0, rows, _TILE):
+        for j0 in range(0, cols, _TILE):
+            for i in range(i0, min(i0 + _TILE, rows)):
+                for j in range(j0, min(j0 + _TILE, cols)):
+                    dst[j, i] = src[i, j]
+
+@njit(cache=True, boundscheck=False, nogil=True)
+def _twiddle_transpose(src, tw, tw_shoup, mod, dst):
+    """dst = (src * tw).T mod p, fusing the twiddle multiply into a tiled transpose."""
+    rows, cols = src.shape
+    for i0 in range(0, rows, _TILE):
+        for j0 in range(0, cols, _TILE):
+            for i in range(i0, min(i0 + _TILE, rows)):
+                for j in range(j0, min(j0 + _TILE, cols)):
+                    dst[j, i] = _shoup_mul(src[i, j], tw[i, j], tw_shoup[i, j], mod)
+
+_transform_rows = _ntt_rows if _HAS_NUMBA else _ntt_rows_numpy
+
+# Sizes from which transform() switches to the cache-blocked (six-step)
+# algorithm: every pass then works on sqrt(n)-sized rows that stay in cache.
+# Only the compiled kernels profit; the NumPy fallback streams whole arrays
+# per operation anyway, so there blocking would only add transposes.
+_BLOCKED_MIN_N = 1 << 20
+
+def _is_blocked(n):
+    return _HAS_NUMBA and n >= _BLOCKED_MIN_N
+
+# ==========================================
+# On-disk table cache
+# ==========================================
+# Tables for n >= _DISK_CACHE_MIN_N are saved as .npy files keyed by
+# (mod_bits, mod, g, n) and memory-mapped on later runs, so a warm start skips the
+# table construction and concurrent processes share the pages. Bump the
+# version whenever the table layout changes.
+_DISK_CACHE_DIR = Path("~/.cache/ntt").expanduser()
+_DISK_CACHE_VERSION = 2
+_DISK_CACHE_MIN_N = 1 << 16
+
+_TABLE_NAMES = (
+    'rev', 'swap_pairs',
+    'stage_roots', 'stage_inv_roots', 'stage_roots_shoup', 'stage_inv_roots_shoup',
+    'stage_roots3', 'stage_inv_roots3', 'stage_roots3_shoup', 'stage_inv_roots3_shoup',
+    'n_inv_scaled_inv_roots', 'n_inv_scaled_inv_roots_shoup',
+)
+_BLOCKED_TABLE_NAMES = (
+    'blocked_twiddles', 'blocked_inv_twiddles',
+    'blocked_twiddles_shoup', 'blocked_inv_twiddles_shoup',
+)
+
+class NTTContext:
+    """
+    A context for NTT operations with a specific prime and primitive root.
+    Provides optimized transforms by pre-computing twiddle factors and bit-reversal maps.
+    """
+    _mod_bits = 31            # largest supported modulus width
+    _mont_bits = _MONT_BITS   # Montgomery radix R = 2^_mont_bits
+    
+    def __init__(self, mod=469762049):
+        """
+        Initializes the NTT context.
+        
+        Args:
+            mod (int): The prime modulus (p = c * 2^k + 1).
+        """
+        # Note: mod check is still done here or via get_primitive_root
+        # Butterflies run on int64 arrays, so a product of two residues
+        # must stay below 2^63 (NTTContext64 widens the products instead).
+        if mod >= (1 << self._mod_bits):
+            raise ValueError(f"Modulus {mod} does not fit in {self._mod_bits} bits")
+        self.mod = mod
+        self.g = get_primitive_root(mod)
+        
+        # 2-adic valuation for safety check
+        self.max_k = get_2_adic_valuation(mod)
+        
+        # Montgomery constants: R^2 mod p converts into the domain and
+        # -p^-1 mod R drives the reduction.
+        r = 1 << self._mont_bits
+        self.mont_r2 = r * r % mod
+        self.mont_neg_inv = (-pow(mod, -1, r)) % r
+        
+        # Pre-computations cache (twiddle tables are stored as int32, see _compact)
+        self.rev = {}          # size N -> bit-reversal indices (np.int64)
+        self.swap_pairs = {}   # size N -> (k, 2) pairs i < rev[i] (np.int64)
+        self.stage_roots = {}      # size N -> per-stage twiddle table (np.int32)
+        self.stage_inv_roots = {}  # size N -> per-stage inverse twiddle table (np.int32)
+        self.stage_roots_shoup = {}      # size N -> Shoup companions of stage_roots
+        self.stage_inv_roots_shoup = {}  # size N -> Shoup companions of stage_inv_roots
+        self.stage_roots3 = {}           # size N -> cubed twiddles for radix-4 stages
+        self.stage_inv_roots3 = {}       # size N -> cubed inverse twiddles
+        self.stage_roots3_shoup = {}     # size N -> Shoup companions of stage_roots3
+        self.stage_inv_roots3_shoup = {} # size N -> Shoup companions of stage_inv_roots3
+        self.n_inv_scaled_inv_roots = {}        # size N -> last inverse stage twiddles * n^-1
+        self.n_inv_scaled_inv_roots_shoup = {}  # size N -> Shoup companions of the above
+        self.blocked_twiddles = {}        # size N -> (n2, n1) inter-tile twiddles w^(j2*k1)
+        self.blocked_inv_twiddles = {}    # size N -> inverse inter-tile twiddles
+        self.blocked_twiddles_shoup = {}      # size N -> Shoup companions of blocked_twiddles
+        self.blocked_inv_twiddles_shoup = {}  # size N -> Shoup companions of blocked_inv_twiddles
+
+        self._plans = {}                  # size N -> transform compiled by compile(N)
+        # Contexts are shared between threads (see multi_mod_ntt._get_context):
+        # tables and plans are built under this lock, since _prepare marks a
+        # size as done (rev[n]) before its other tables exist
+        self._lock = threading.RLock()
+
+        # Directory of the on-disk table cache; None disables it
+        self._cache_dir = _DISK_CACHE_DIR
+
+    def _prepare(self, n):
+        """
+        Pre-computes bit-reversal mapping and twiddle factors for size n.
+        Thread-safe: concurrent callers wait until the tables are complete.
+        
+        Args:
+            n (int): The size of the transform (must be a power of 2).
+        """
+        with self._lock:
+            self._build_tables(n)
+
+    def _build_tables(self, n):
+        """Body of _prepare; the caller holds self._lock."""
+        if n in self.rev or n in self.blocked_twiddles:
+            return
+        if _is_blocked(n):
+            self._prepare_blocked(n)
+            return
+        if self._load_tables(n, _TABLE_NAMES):
+            return
+
+        mod = self.mod
+
+        # 1. Pre-compute Bit-reversal indices
+        rev = np.zeros(n, dtype=np.int64)
+        idx = np.arange(n, dtype=np.int64)
+        h = n.bit_length() - 1
+        for bit in range(h):
+            rev |= ((idx >> bit) & 1) << (h - 1 - bit)
+        self.rev[n] = rev
+        swap = idx < rev
+        self.swap_pairs[n] = np.stack((idx[swap], rev[swap]), axis=1)
+
+        # 2. Pre-compute Twiddle factors (roots of unity)
+        # Stage `length` only needs w_length^j for j < length/2, so each
+        # stage gets its own contiguous slice: stage_roots[n][length/2 + j].
+        # The butterfly then walks its twiddles with stride 1 instead of
+        # striding through a single size-n table.
+        roots = np.zeros(n, dtype=np.int64)
+        inv_roots = np.zeros(n, dtype=np.int64)
+        
+        # Primitive n-th root of unity w = g^((mod-1)/n) % mod
+        w_n = pow(self.g, (mod - 1) // n, mod)
+        w_inv = pow(w_n, -1, mod)
+        
+        length = 2
+        while length <= n:
+            half = length // 2
+            # length-th root of unity is w^(n/length)
+            w_len = pow(w_n, n // length, mod)
+            w_len_inv = pow(w_inv, n // length, mod)
+            if half == 1:
+                roots[1] = inv_roots[1] = 1
+            else:
+                # Even powers are the previous stage's table; odd ones are
+                # those times w_length.
+                prev, prev_inv = roots[half // 2:half], inv_roots[half // 2:half]
+                roots[half:length:2] = prev
+                roots[half + 1:length:2] = self._mulmod(prev, w_len)
+                inv_roots[half:length:2] = prev_inv
+                inv_roots[half + 1:length:2] = self._mulmod(prev_inv, w_len_inv)
+            length <<= 1
+            
+        self.stage_roots[n] = self._table(roots)
+        self.stage_inv_roots[n] = self._table(inv_roots)
+        self.stage_roots_shoup[n] = self._shoup(roots)
+        self.stage_inv_roots_shoup[n] = self._shoup(inv_roots)
+        
+        # 3. Radix-4 stage of half-length h also needs w_4h^(3j) = w_4h^j * w_2h^j,
+        # stored like the other tables at offset h.
+        roots3 = np.zeros(n, dtype=np.int64)
+        inv_roots3 = np.zeros(n, dtype=np.int64)
+        h = 1
+        while 4 * h <= n:
+            roots3[h:2 * h] = self._mulmod(roots[2 * h:3 * h], roots[h:2 * h])
+            inv_roots3[h:2 * h] = self._mulmod(inv_roots[2 * h:3 * h], inv_roots[h:2 * h])
+            h *= 2
+        self.stage_roots3[n] = self._table(roots3)
+        self.stage_inv_roots3[n] = self._table(inv_roots3)
+        self.stage_roots3_shoup[n] = self._shoup(roots3)
+        self.stage_inv_roots3_shoup[n] = self._shoup(inv_roots3)
+        
+        # 4. Last inverse stage with n^-1 folded into its twiddles
+        scaled = self._mulmod(inv_roots[n // 2:], pow(n, -1, mod))
+        self.n_inv_scaled_inv_roots[n] = self._table(scaled)
+        self.n_inv_scaled_inv_roots_shoup[n] = self._shoup(scaled)
+        self._save_tables(n, _TABLE_NAMES)
+
+    @staticmethod
+    def _split(n):
+        """Splits n = n1 * n2 into the two (near-square) tile sizes of the blocked transform."""
+        n1 = 1 << ((n.bit_length() - 1) // 2)
+        return n1, n // n1
+
+    def _prepare_blocked(self, n):
+        """
+        Pre-computes the tables of the blocked transform for size n: the two
+        tile sizes are prepared as ordinary transforms, plus the twiddles
+        applied between the passes.
+        """
+        mod = self.mod
+        n1, n2 = self._split(n)
+        self._prepare(n1)
+        self._prepare(n2)
+        if self._load_tables(n, _BLOCKED_TABLE_NAMES):
+            return
+        
+        # powers[e] = w_n^e for all e < n, doubling the table each step
+        w_n = pow(self.g, (mod - 1) // n, mod)
+        powers = np.ones(1, dtype=np.int64)
+        while powers.shape[0] < n:
+            step = pow(w_n, powers.shape[0], mod)
+            powers = np.concatenate([powers, self._mulmod(powers, step)])
+        
+        exps = np.outer(np.arange(n2, dtype=np.int64), np.arange(n1, dtype=np.int64)) % n
+        twiddles = powers[exps]
+        inv_twiddles = powers[(n - exps) % n]
+        self.blocked_twiddles[n] = self._table(twiddles)
+        self.blocked_inv_twiddles[n] = self._table(inv_twiddles)
+        self.blocked_twiddles_shoup[n] = self._shoup(twiddles)
+        self.blocked_inv_twiddles_shoup[n] = self._shoup(inv_twiddles)
+        self._save_tables(n, _BLOCKED_TABLE_NAMES)
+
+    def _cache_path(self, n, name):
+        # NTTContext and NTTContext64 store different layouts for the same
+        # prime (int32 + 2^31 Shoup vs int64 + 2^64 Shoup), so the width is in the name
+        return (self._cache_dir /
+                f"v{_DISK_CACHE_VERSION}_{self._mod_bits}_{self.mod}_{self.g}_{n}_{name}.npy")
+
+    def _load_tables(self, n, names):
+        """
+        Memory-maps the cached tables `names` for size n from disk.
+        Returns False (loading nothing) if any of them is missing or unreadable.
+        """
+        if self._cache_dir is None or n < _DISK_CACHE_MIN_N:
+            return False
+        try:
+            tables = [np.asarray(np.load(self._cache_path(n, name), mmap_mode='r'))
+                      for name in names]
+        except (OSError, ValueError):
+            return False
+        for name, table in zip(names, tables):
+            getattr(self, name)[n] = table
+        return True
+
+    def _save_tables(self, n, names):
+        """Writes the tables `names` for size n to the disk cache; failures are ignored."""
+        if self._cache_dir is None or n < _DISK_CACHE_MIN_N:
+            return
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            for name in names:
+                path = self._cache_path(n, name)
+                if path.exists():
+                    continue
+                # Write under a private name first so readers never see a partial file
+                tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+                with open(tmp, 'wb') as f:
+                    np.save(f, getattr(self, name)[n])
+                os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _mulmod(self, x, y):
+        """x * y mod p for int64 arrays or scalars (table construction)."""
+        return x * y % self.mod
+
+    def _table(self, table):
+        """Storage form of a twiddle table."""
+        return _compact(table)
+
+    def _shoup(self, w):
+        """Shoup companion of a twiddle table or scalar, in its storage form."""
+        w_shoup = _shoup_precompute(w, self.mod)
+        return _compact(w_shoup) if isinstance(w_shoup, np.ndarray) else w_shoup
+
+    def _mont_mul(self, x, y):
+        """Montgomery product x * y * R^-1 mod p (scalars or int64 arrays)."""
+        return _mont_mul(x, y, self.mod, self.mont_neg_inv)
+
+    def _to_mont(self, a):
+        """Maps an int64 array of residues into Montgomery form (x -> x * R mod p) in-place."""
+        a[:] = self._mont_mul(a, self.mont_r2)
+        return a
+
+    def _from_mont(self, a):
+        """Maps Montgomery-form values back to residues (x * R -> x)."""
+        return _mont_reduce(a, self.mod, self.mont_neg_inv)
+
+    def _as_residues(self, a):
+        """
+        Returns `a` as a contiguous int64 array of residues mod p.
+        An int64 ndarray is reduced and used in-place; anything else is copied.
+        """
+        mod = self.mod
+        if isinstance(a, np.ndarray) and a.dtype == np.int64 and a.flags.c_contiguous:
+            np.mod(a, mod, out=a)
+            return a
+        if isinstance(a, np.ndarray) and a.dtype == np.uint64:
+            a = a % np.uint64(mod)
+        try:
+            arr = np.array(a, dtype=np.int64)
+        except OverflowError:
+            # Coefficients beyond int64 are reduced as Python ints first
+            return np.array([x % mod for x in a], dtype=np.int64)
+        np.mod(arr, mod, out=arr)
+        return arr
+
+    def _padded(self, polys, n):
+        """
+        Returns the residues of `polys` as a zero-padded (len(polys), n) int64
+        matrix, reduced with one np.mod; the inputs themselves are left untouched.
+        """
+        mod = self.mod
+        out = np.zeros((len(polys), n), dtype=np.int64)
+        for row, a in zip(out, polys):
+            if isinstance(a, np.ndarray) and a.dtype == np.uint64:
+                a = a % np.uint64(mod)
+            try:
+                row[:len(a)] = a
+            except OverflowError:
+                # Coefficients beyond int64 are reduced as Python ints first
+                row[:len(a)] = [x % mod for x in a]
+        np.mod(out, mod, out=out)
+        return out
+
+    def transform(self, a, invert=False):
+        """
+        Performs Forward or Inverse NTT in-place.
+        
+        Mathematical Background:
+        NTT maps coefficients {a_i} to point-values {A_j} where 
+        A_j = sum_{i=0}^{n-1} a_i * (w^j)^i (mod p).
+        This is exactly like DFT but replaces e^(2πi/n) with w.
+        """
+        arr = self._as_residues(a)
+        self.compile(len(a))(arr, invert)
+        
+        # Lists are transformed through a copy; write back to keep in-place semantics
+        if arr is not a:
+            a[:] = arr.tolist()
+        return a
+
+    def _transform_2d(self, mat, invert=False):
+        """Transforms every row of a C-contiguous (rows, m) int64 residue matrix in-place."""
+        self.compile(mat.shape[1])(mat, invert)
+
+    def compile(self, n):
+        """
+        Returns the transform specialized to size n, built once per context.
+        Tables, n^-1 and its Shoup companion are bound when the plan is
+        built, so a call is a single kernel dispatch.
+        
+        Args:
+            n (int): The size of the transform (must be a power of 2).
+        
+        Returns:
+            callable: plan(a, invert=False) transforming in-place a C-contiguous
+            int64 residue array of length n, or every row of an (rows, n) matrix.
+        """
+        plan = self._plans.get(n)
+        if plan is not None:
+            return plan
+        with self._lock:
+            return self._plans.get(n) or self._build_plan(n)
+
+    def _build_plan(self, n):
+        """Body of compile; the caller holds self._lock."""
+        self._prepare(n)
+        if _is_blocked(n):
+            def plan(a, invert=False):
+                for row in a.reshape(-1, n):
+                    self._transform_blocked(row, invert)
+        else:
+            mod = self.mod
+            n_inv = pow(n, -1, mod)
+            forward = (self.stage_roots[n], self.stage_roots_shoup[n],
+                       self.stage_roots3[n], self.stage_roots3_shoup[n])
+            inverse = (self.stage_inv_roots[n], self.stage_inv_roots_shoup[n],
+                       self.stage_inv_roots3[n], self.stage_inv_roots3_shoup[n])
+            last = (self.n_inv_scaled_inv_roots[n], self.n_inv_scaled_inv_roots_shoup[n],
+                    n_inv, self._shoup(n_inv), mod)
+            # numba walks the swap list; NumPy does one gather through `rev`
+            perm = self.swap_pairs[n] if _HAS_NUMBA else self.rev[n]
+            
+            def plan(a, invert=False):
+                _transform_rows(a.reshape(-1, n), perm, *(inverse if invert else forward),
+                                *last, invert)
+        self._plans[n] = plan
+        return plan
+
+    def _transform_blocked(self, arr, invert=False):
+        """
+        Six-step transform of a large 1-D array, viewed as an (n1, n2) matrix:
+        length-n1 transforms down the columns, a twiddle multiply, then
+        length-n2 transforms along the rows. Each small transform fits in
+        cache, and the transposes in between keep every pass contiguous.
+        """
+        n = arr.shape[0]
+        n1, n2 = self._split(n)
+        self._prepare(n)
+        if invert:
+            tw, tw_shoup = self.blocked_inv_twiddles[n], self.blocked_inv_twiddles_shoup[n]
+        else:
+            tw, tw_shoup = self.blocked_twiddles[n], self.blocked_twiddles_shoup[n]
+        
+        cols = np.empty((n2, n1), dtype=np.int64)
+        rows = np.empty((n1, n2), dtype=np.int64)
+        _transpose(arr.reshape(n1, n2), cols)
+        self._transform_2d(cols, invert)
+        _twiddle_transpose(cols, tw, tw_shoup, self.mod, rows)
+        self._transform_2d(rows, invert)
+        # Output index is k1 + n1 * k2, i.e. the transpose of `rows`
+        _transpose(rows, arr.reshape(n2, n1))
+
+    def multiply(self, a, b):
+        """
+        Fast polynomial multiplication using NTT.
+        Complexity: O(N log N)
+        Returns an int64 ndarray if both inputs are ndarrays, a list otherwise.
+        """
+        res = self._product(a, b)
+        if isinstance(a, np.ndarray) and isinstance(b, np.ndarray):
+            return res
+        return res.tolist()
+
+    def multiply_into(self, a, b, out):
+        """
+        Like multiply, but writes the len(a) + len(b) - 1 residues into the
+        ndarray `out` (any integer dtype wide enough for the modulus, e.g. a
+        row of a uint32 matrix) instead of allocating a result.
+        """
+        out[...] = self._product(a, b)
+        return out
+
+    def _product(self, a, b):
+        """Returns the product of a and b as an int64 ndarray of residues."""
+        target_len = len(a) + len(b) - 1
+        n = 1 << (target_len - 1).bit_length()
+        
+        # Work in Montgomery form so the point-wise products need no division.
+        # The transforms are linear (twiddles are Shoup-multiplied constants),
+        # so they map Montgomery-form inputs to Montgomery-form outputs.
+        fa = self._to_mont(self._padded([a], n)[0])
+        fb = self._to_mont(self._padded([b], n)[0])
+        
+        self.transform(fa, False)
+        self.transform(fb, False)
+        
+        fa[:] = self._mont_mul(fa, fb)
+            
+        self.transform(fa, True)
+        return self._from_mont(fa[:target_len])
+
+    def multiply_batch(self, polys_a, polys_b):
+        """
+        Multiplies polys_a[i] * polys_b[i] for every i in one pass: all pairs
+        are padded to a common size n and stacked into (k, n) matrices, so
+        the tables, transforms and point-wise products are shared by the batch.
+        
+        Args:
+            polys_a (list): Left operands (lists or ndarrays of coefficients).
+            polys_b (list): Right operands, same length as polys_a.
+        
+        Returns:
+            list: The k products as lists of residues mod p.
+        """
+        if len(polys_a) != len(polys_b):
+            raise ValueError("polys_a and polys_b must have the same length")
+        if not polys_a:
+            return []
+        res = self._product_batch(polys_a, polys_b)
+        return [res[i, :len(a) + len(b) - 1].tolist()
+                for i, (a, b) in enumerate(zip(polys_a, polys_b))]
+
+    def _product_batch(self, polys_a, polys_b):
+        """
+        Returns the products of a non-empty batch as a (k, n) int64 residue
+        matrix, n being the common padded size; row i is zero past its length.
+        """
+        target_len = max(len(a) + len(b) - 1 for a, b in zip(polys_a, polys_b))
+        n = 1 << (target_len - 1).bit_length()
+        
+        fa = self._to_mont(self._padded(polys_a, n))
+        fb = self._to_mont(self._padded(polys_b, n))
+        
+        self._transform_2d(fa, False)
+        self._transform_2d(fb, False)
+        fa[:] = self._mont_mul(fa, fb)
+        self._transform_2d(fa, True)
+        
+        return self._from_mont(fa)
+
+class NTTContext64(NTTContext):
+    """
+    NTTContext for NTT primes below 2^62 (e.g. 29 * 2^57 + 1), so two primes
+    cover what takes three 31-bit ones in multi-modulus multiplication.
+    The butterfly kernels are shared: uint64 Shoup companions select the
+    widening 62-bit multiply, and point-wise products use Montgomery with R = 2^64.
+    """
+    _mod_bits = 62
+    _mont_bits = 64
+
+    def __init__(self, mod=4179340454199820289):
+        super().__init__(mod)
+
+    def _mulmod(self, x, y):
+        """x * y mod p via two Montgomery products (x * y * R^-1, then * R^2 * R^-1)."""
+        return self._mont_mul(self._mont_mul(x, y), self.mont_r2)
+
+    def _table(self, table):
+        return table
+
+    def _shoup(self, w):
+        return _shoup_precompute62(w, self.mod)
+
+    def _mont_mul(self, x, y):
+        """Montgomery product x * y * 2^-64 mod p (scalars or int64 arrays)."""
+        if not _HAS_NUMBA:
+            return _mont_mul62(x, y, self.mod, self.mont_neg_inv)
+        x = np.ascontiguousarray(x, dtype=np.int64)
+        y = np.broadcast_to(np.asarray(y, dtype=np.int64), x.shape)
+        out = np.empty(x.shape, dtype=np.int64)
+        _mont_mul62_arrays(x.ravel(), y.ravel(), self.mod, self.mont_neg_inv, out.reshape(-1))
+        return out if out.ndim else int(out)
+
+    def _from_mont(self, a):
+        return self._mont_mul(a, 1)
+
+class NTTContextBig(NTTContext):
+    """
+    NTTContext for NTT primes of any width, e.g. the Goldilocks prime
+    2^64 - 2^32 + 1. Residues live in NumPy object arrays of Python ints,
+    so each radix-2 stage is still one array-wide butterfly but the
+    arithmetic is arbitrary precision: ~50x slower than NTTContext64 on a
+    2^14-term product, so make_context only picks it for primes beyond 62 bits.
+    """
+    _mod_bits = None  # no limit
+
+    def __init__(self, mod=18446744069414584321):
+        """
+        Args:
+            mod (int): The prime modulus (p = c * 2^k + 1).
+        """
+        self.mod = mod
+        self.g = get_primitive_root(mod)
+        self.max_k = get_2_adic_valuation(mod)
+
+        # Pre-computations cache (object arrays of Python ints)
+        self.rev = {}              # size N -> bit-reversal indices (np.int64)
+        self.stage_roots = {}      # size N -> per-stage twiddle table
+        self.stage_inv_roots = {}  # size N -> per-stage inverse twiddle table
+        self._plans = {}
+        self._lock = threading.RLock()
+        self._cache_dir = None     # object arrays are not cached on disk
+
+    def _build_tables(self, n):
+        """Bit-reversal indices and stage twiddles w_length^j at offset length/2 + j."""
+        if n in self.rev:
+            return
+        mod = self.mod
+        rev = np.zeros(n, dtype=np.int64)
+        idx = np.arange(n, dtype=np.int64)
+        h = n.bit_length() - 1
+        for bit in range(h):
+            rev |= ((idx >> bit) & 1) << (h - 1 - bit)
+
+        roots = np.zeros(n, dtype=object)
+        inv_roots = np.zeros(n, dtype=object)
+        w_n = pow(self.g, (mod - 1) // n, mod)
+        w_inv = pow(w_n, -1, mod)
+        length = 2
+        while length <= n:
+            half = length // 2
+            w_len, w_len_inv = pow(w_n, n // length, mod), pow(w_inv, n // length, mod)
+            w = w_i = 1
+            for j in range(half):
+                roots[half + j], inv_roots[half + j] = w, w_i
+                w, w_i = w * w_len % mod, w_i * w_len_inv % mod
+            length <<= 1
+        self.stage_roots[n] = roots
+        self.stage_inv_roots[n] = inv_roots
+        self.rev[n] = rev
+
+    def _build_plan(self, n):
+        self._prepare(n)
+        mod = self.mod
+        n_inv = pow(n, -1, mod)
+        rev = self.rev[n]
+        forward, inverse = self.stage_roots[n], self.stage_inv_roots[n]
+
+        def plan(a, invert=False):
+            rows = a.reshape(-1, n)
+            rows[:] = rows[:, rev]
+            roots = inverse if invert else forward
+            length = 2
+            while length <= n:
+                half = length // 2
+                # (rows, blocks, 2, half): [..., 0, :] and [..., 1, :] are the butterfly halves
+                pairs = rows.reshape(rows.shape[0], n // length, 2, half)
+                u = pairs[:, :, 0]
+                v = pairs[:, :, 1] * roots[half:length] % mod
+                pairs[:, :, 0], pairs[:, :, 1] = (u + v) % mod, (u - v) % mod
+                length <<= 1
+            if invert:
+                rows[:] = rows * n_inv % mod
+
+        self._plans[n] = plan
+        return plan
+
+    def _as_residues(self, a):
+        """Returns `a` as an object array of residues mod p (object ndarrays are reduced in-place)."""
+        if isinstance(a, np.ndarray) and a.dtype == object and a.flags.c_contiguous:
+            a[...] = a % self.mod
+            return a
+        return np.array(a, dtype=object) % self.mod
+
+    def _padded(self, polys, n):
+        out = np.zeros((len(polys), n), dtype=object)
+        for row, a in zip(out, polys):
+            row[:len(a)] = np.array(a, dtype=object) % self.mod
+        return out
+
+    # No Montgomery form: Python ints multiply and reduce directly
+    def _mont_mul(self, x, y):
+        return x * y % self.mod
+
+    def _to_mont(self, a):
+        return a
+
+    def _from_mont(self, a):
+        return a
+
+def make_context(mod):
+    """
+    Returns an NTT context for the prime `mod`: NTTContext if it fits in
+    31 bits, NTTContext64 for primes below 2^62 and NTTContextBig beyond.
+    """
+    if mod >= (1 << NTTContext64._mod_bits):
+        return NTTContextBig(mod)
+    if mod >= (1 << NTTContext._mod_bits):
+        return NTTContext64(mod)
+    return NTTContext(mod)
+
+# Default context, created on first use so importing stays cheap
+_ctx = None
+
+def _get_default_ctx():
+    global _ctx
+    if _ctx is None:
+        _ctx = NTTContext()
+    return _ctx
+
+def ntt(a, invert=False):
+    return _get_default_ctx().transform(a, invert)
+
+def multiply_polynomials(a, b):
+    return _get_default_ctx().multiply(a, b)
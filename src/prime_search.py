@@ -1,28 +1,47 @@
 
+import bisect
+import heapq
 import math
 import argparse
 import sys
+from functools import lru_cache
+
+import numpy as np
 
 try:
-    from sympy import isprime
+    from sympy import factorint, isprime, primerange
     from sympy.ntheory import primitive_root
 except ImportError:
     print("Error: 'sympy' library is not installed.")
     print("Please install it using: pip install sympy")
     sys.exit(1)
 
+def smallest_generator(p, exact_k):
+    """
+    Returns the smallest primitive root of the odd prime p, given p - 1 = 2^exact_k * s.
+    g generates iff g^((p-1)/q) != 1 for every prime q | p - 1; for NTT
+    primes s is small, so factoring it is cheap and the first few g pass.
+    """
+    p_minus_1 = p - 1
+    exps = [p_minus_1 // 2] + [p_minus_1 // q for q in factorint(p_minus_1 >> exact_k)]
+    g = 2
+    while any(pow(g, e, p) == 1 for e in exps):
+        g += 1
+    return g
+
+@lru_cache(maxsize=None)
 def get_primitive_root(p):
-    """Returns a primitive root modulo p."""
+    """Returns the smallest primitive root modulo p (cached, sympy's search is slow for large p)."""
+    if p > 2 and isprime(p):
+        return smallest_generator(p, get_2_adic_valuation(p))
     return int(primitive_root(p))
 
+@lru_cache(maxsize=None)
 def get_2_adic_valuation(p):
     """Returns the maximum power of 2 that divides p-1."""
+    # p-1 & -(p-1) isolates the lowest set bit
     p_minus_1 = p - 1
-    k = 0
-    while p_minus_1 % 2 == 0:
-        p_minus_1 //= 2
-        k += 1
-    return k
+    return (p_minus_1 & -p_minus_1).bit_length() - 1
 
 def is_ntt_friendly(p, n):
     """Checks if prime p supports NTT size n (n must be power of 2)."""
@@ -35,57 +54,101 @@ def get_root_of_unity(p, n):
     g = get_primitive_root(p)
     return pow(g, (p - 1) // n, p)
 
+# One row per NTT prime candidate; g = 0 until the primitive root is known
+_CANDIDATE_DTYPE = np.dtype([("p", "u4"), ("exact_k", "u1"), ("popcount", "u1"),
+                             ("g", "u2"), ("base", "i4"), ("score", "i4")])
+
+def sieve_ntt_primes(chk_val, limit=2**31):
+    """
+    Returns every prime p = k * chk_val + 1 < limit (k >= 1) as an ascending int64 array.
+    Sieves the progression itself: a prime q divides k * chk_val + 1 exactly
+    when k = -chk_val^-1 (mod q), so each q up to sqrt(limit) strikes out one
+    stride of k values and no per-candidate primality test is needed.
+    """
+    max_k = (limit - 2) // chk_val
+    is_prime = np.ones(max(max_k + 1, 1), dtype=bool)  # indexed by k
+    is_prime[0] = False
+    for q in primerange(2, math.isqrt(limit - 1) + 1):
+        if chk_val % q == 0:
+            continue
+        k0 = -pow(chk_val, -1, q) % q
+        # k0 * chk_val + 1 may be q itself, which is prime
+        is_prime[k0 + q if k0 * chk_val + 1 == q else k0::q] = False
+    return np.flatnonzero(is_prime) * chk_val + 1
+
+def _popcount32(x):
+    """Bitwise popcount of a uint32 array (SWAR: pairs, nibbles, then a byte sum)."""
+    x = x - ((x >> 1) & 0x55555555)
+    x = (x & 0x33333333) + ((x >> 2) & 0x33333333)
+    x = (x + (x >> 4)) & 0x0F0F0F0F
+    return (x * 0x01010101) >> 24
+
+def _select_top(candidates, count):
+    """
+    Returns the `count` best candidates by score (ties: smaller p first) as dicts.
+    Scores are base - g with g >= 1, so candidates are visited by base score
+    and primitive roots are only computed until no later one can rank.
+    The selected candidates also get their max root of unity "w_N".
+    """
+    if count <= 0:
+        return []
+    ranked = []  # best `count` as sorted (-score, p, index) tuples
+    for i in np.argsort(-candidates["base"], kind="stable"):
+        cand = candidates[i]
+        if len(ranked) >= count and cand["base"] - 1 < -ranked[-1][0]:
+            break
+        if cand["g"] == 0:
+            cand["g"] = smallest_generator(int(cand["p"]), int(cand["exact_k"]))
+            cand["score"] = cand["base"] - cand["g"]
+        bisect.insort(ranked, (-int(cand["score"]), int(cand["p"]), int(i)))
+        del ranked[count:]
+    
+    selected = []
+    for cand in candidates[[i for _, _, i in ranked]]:
+        p, exact_k, g = int(cand["p"]), int(cand["exact_k"]), int(cand["g"])
+        selected.append({
+            "p": p,
+            "exact_k": exact_k,
+            "max_N": 1 << exact_k,
+            "popcount": int(cand["popcount"]),
+            "g": g,
+            "score": int(cand["score"]),
+            "w_N": pow(g, (p - 1) >> exact_k, p),
+        })
+    return selected
+
 def search_ntt_prime(n_power=20, count=5, lower_g=False):
     """
     Finds primes suitable for Number Theoretic Transform (NTT).
     Form: p = k * 2^n_power + 1
+    Returns the selected candidate dicts (p, g, max_N, w_N, ...).
     """
     chk_val = 1 << n_power
     print(f"Searching for NTT primes of the form p = k * 2^{n_power} + 1 (N >= {chk_val})")
     print(f"Start searching... (Max limit: 2^31 - 1)")
     
-    candidates = []
+    # Stop condition: p must fit in 32-bit signed integer
+    primes = sieve_ntt_primes(chk_val, 2**31)
+    candidates = np.zeros(len(primes), dtype=_CANDIDATE_DTYPE)
+    candidates["p"] = primes
     
-    k = 1
-    while True:
-        p = k * chk_val + 1
-        
-        # Stop condition: p must fit in 32-bit signed integer
-        if p >= 2**31:
-            break
-            
-        if isprime(p):
-            is_optimal = True
-            reasons = []
+    # Condition: Check exact power of 2 divisibility; (p-1) & -(p-1) is the
+    # lowest set bit, and log2 is exact on powers of two
+    p_minus_1 = primes - 1
+    candidates["exact_k"] = np.log2(p_minus_1 & -p_minus_1)
 
-            # Condition: Check exact power of 2 divisibility
-            p_minus_1 = p - 1
-            exact_k = 0
-            while p_minus_1 % 2 == 0:
-                p_minus_1 //= 2
-                exact_k += 1
-            
-            # Find a primitive root modulo p
-            g = primitive_root(p)
-            
-            # Condition: Small primitive root (optional but good)
-            if lower_g and g > 10:
-                is_optimal = False
-                reasons.append(f"g={g} > 10")
-
-            # Condition: Low Hamming Weight (Popcount)
-            popcount = bin(p).count('1')
-            
-            if is_optimal:
-                score = (exact_k * 1000) - (popcount * 10) - g
-                candidates.append({
-                    "p": p, 
-                    "exact_k": exact_k, 
-                    "popcount": popcount, 
-                    "g": g,
-                    "score": score
-                })
-        k += 1
+    # Condition: Low Hamming Weight (Popcount)
+    candidates["popcount"] = _popcount32(candidates["p"])
+    exact_k, popcount = candidates["exact_k"].astype(np.int32), candidates["popcount"].astype(np.int32)
+    candidates["base"] = (exact_k * 1000) - (popcount * 10)
+    
+    # Condition: Small primitive root (optional but good). Without the
+    # filter g only breaks ties, so it is found later for the top ranks.
+    if lower_g:
+        candidates["g"] = [smallest_generator(p, k)
+                           for p, k in zip(candidates["p"].tolist(), candidates["exact_k"].tolist())]
+        candidates = candidates[candidates["g"] <= 10]
+        candidates["score"] = candidates["base"] - candidates["g"]
 
     # Post-processing
     print("\n" + "="*60)
@@ -94,27 +157,41 @@ def search_ntt_prime(n_power=20, count=5, lower_g=False):
     print("Sorting Criteria: Max 2^k > Low Popcount > Small g")
     print("="*60)
 
-    candidates.sort(key=lambda x: x["score"], reverse=True)
-    selected = candidates[:count]
+    selected = _select_top(candidates, count)
     
     for idx, cand in enumerate(selected):
-        p = cand["p"]
-        max_N = 1 << cand['exact_k']
-        w_N = pow(cand['g'], (p - 1) // max_N, p)
+        p, max_N = cand["p"], cand["max_N"]
         
         print(f"Rank {idx+1}: {p}")
         print(f"    - 2-adic valuation: 2^{cand['exact_k']} (Max N: {max_N})")
         print(f"    - Primitive Root (g): {cand['g']}")
-        print(f"    - Max Root of Unity (w_{max_N}): {w_N}")
+        print(f"    - Max Root of Unity (w_{max_N}): {cand['w_N']}")
         print(f"    - Popcount: {cand['popcount']}")
         print(f"    - Hex: {hex(p)}")
         print("-" * 40)
+    return selected
+
+def _solinas_grid(n_start, n_end):
+    """
+    Returns the (n, m, sign, p) arrays of every p = 2^n - 2^m + sign < 2^31
+    with 1 <= m <= n/2 and sign = -1, +1, in n / m / sign loop order.
+    p >= 2^(n-1) here, so only n <= 31 can pass the limit.
+    """
+    n = np.arange(n_start, min(n_end, 31) + 1, dtype=np.int64)
+    m = np.arange(1, (n.max() // 2 if n.size else 0) + 1, dtype=np.int64)
+    n, m, sign = np.meshgrid(n, m, np.array([-1, 1], dtype=np.int64), indexing="ij")
+    p = (1 << n) - (1 << m) + sign
+    
+    # Check 2^31 limit (exclude if >= 2^31)
+    keep = (2 * m <= n) & (p < 2**31)
+    return n[keep], m[keep], sign[keep], p[keep]
 
-def search_goldilock_prime(n_start=20, n_end=31):
+def search_goldilock_prime(n_start=20, n_end=31, count=None):
     """
     Finds "Goldilocks-like" primes (Solinas primes) of the form:
     1. 2^n - c (where c is small)
     2. 2^n - 2^m - 1 (Generalized Mersenne)
+    Prints every candidate, or only the best `count` if given.
     """
     print(f"Searching for Goldilocks-like primes near 2^{n_start} to 2^{n_end}...")
     print(f"{'Prime (p)':<15} | {'Form':<20} | {'Type':<15} | {'Note'}")
@@ -122,10 +199,14 @@ def search_goldilock_prime(n_start=20, n_end=31):
     
     candidates = []
 
+    # No small-prime prefilter in front of isprime: sympy trial-divides before
+    # Miller-Rabin, so composites are already rejected cheaply and the time
+    # goes into the primes, which a prefilter cannot skip.
     for n in range(n_start, n_end + 1):
+        pow_n = 1 << n
         # Type 1: Pseudo-Mersenne (2^n - c)
         for c in range(1, 100):
-            p = (1 << n) - c
+            p = pow_n - c
             if isprime(p):
                 note = ""
                 if n % 32 == 0 or n % 64 == 0:
@@ -140,53 +221,51 @@ def search_goldilock_prime(n_start=20, n_end=31):
                 })
                 break 
 
-        # Type 2: Solinas (2^n - 2^m +/- 1)
-        for m in range(1, n // 2 + 1):
-            # Check both -1 and +1
-            for sign in [-1, 1]:
-                p = (1 << n) - (1 << m) + sign
-                
-                # Check 2^31 limit (exclude if >= 2^31)
-                if p >= 2**31:
-                    continue
-                    
-                if isprime(p):
-                    score = 0
-                    note = []
-                    
-                    # Check for "Golden" ratio property (m approx n/2)
-                    if 2 * m == n:
-                        note.append("Golden! (phi)")
-                        score += 100
-                    elif abs(2 * m - n) <= 1:
-                         note.append("Near-Golden")
-                         score += 50
-                    
-                    # Check for Word Alignment
-                    if n % 32 == 0:
-                        note.append("Word 32-bit")
-                        score += 20
-                    
-                    sign_str = "-" if sign == -1 else "+"
-                    
-                    # Calculate 2-adic valuation
-                    p_minus_1 = p - 1
-                    k = 0
-                    while p_minus_1 % 2 == 0:
-                        p_minus_1 //= 2
-                        k += 1
-
-                    candidates.append({
-                        "p": p,
-                        "form": f"2^{n} - 2^{m} {sign_str} 1",
-                        "type": "Solinas",
-                        "note": ", ".join(note),
-                        "score": score,
-                        "k": k # Added k to dict for verification
-                    })
-
-    # Sort by Score (Desc) then by Prime size (Asc)
-    candidates.sort(key=lambda x: (x.get("score", 0), x["p"]), reverse=True)
+
+    # Type 2: Solinas (2^n - 2^m +/- 1), tested for the whole grid at once
+    # (each distinct p once); metadata is only built for the primes
+    solinas = _solinas_grid(n_start, n_end)
+    is_p = {p: isprime(p) for p in np.unique(solinas[3]).tolist()}
+    for n, m, sign, p in zip(*(col.tolist() for col in solinas)):
+        if is_p[p]:
+            score = 0
+            note = []
+            
+            # Check for "Golden" ratio property (m approx n/2)
+            if 2 * m == n:
+                note.append("Golden! (phi)")
+                score += 100
+            elif abs(2 * m - n) <= 1:
+                 note.append("Near-Golden")
+                 score += 50
+            
+            # Check for Word Alignment
+            if n % 32 == 0:
+                note.append("Word 32-bit")
+                score += 20
+            
+            sign_str = "-" if sign == -1 else "+"
+            
+            # Calculate 2-adic valuation
+            p_minus_1 = p - 1
+            k = (p_minus_1 & -p_minus_1).bit_length() - 1
+
+            candidates.append({
+                "p": p,
+                "form": f"2^{n} - 2^{m} {sign_str} 1",
+                "type": "Solinas",
+                "note": ", ".join(note),
+                "score": score,
+                "k": k # Added k to dict for verification
+            })
+
+    # Sort by Score (Desc) then by Prime size (Asc); for a top-count listing
+    # a bounded heap avoids sorting every candidate
+    key = lambda x: (x.get("score", 0), x["p"])
+    if count is None:
+        candidates.sort(key=key, reverse=True)
+    else:
+        candidates = heapq.nlargest(count, candidates, key=key)
 
     for cand in candidates:
         print(f"{cand['p']:<15} | {cand['form']:<20} | {cand['type']:<15} | {cand['note']}")
@@ -211,12 +290,13 @@ if __name__ == "__main__":
     parser_gold = subparsers.add_parser("search_goldilock_prime", help="Search for Goldilocks/Solinas primes")
     parser_gold.add_argument("--n_start", type=int, default=20, help="Start power of 2")
     parser_gold.add_argument("--n_end", type=int, default=31, help="End power of 2")
+    parser_gold.add_argument("--count", type=int, default=None, help="Number of primes to display (default: all)")
     
     args = parser.parse_args()
     
     if args.command == "search_ntt_prime":
         search_ntt_prime(args.n_power, args.count, args.lower_g)
     elif args.command == "search_goldilock_prime":
-        search_goldilock_prime(args.n_start, args.n_end)
+        search_goldilock_prime(args.n_start, args.n_end, args.count)
     else:
         parser.print_help()